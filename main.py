@@ -1,187 +1,549 @@
 # main.py
 
+import math
 import time
-import requests
+import queue
+import random
+import hashlib
 import asyncio
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+import logging
+from datetime import datetime, timedelta, time as dt_time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from zoneinfo import ZoneInfo
+import aiohttp
+import ijson
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from yarl import URL
 
 app = FastAPI()
 
 # ----------------------------------------------------------------
-#  In-memory cache for “totals” and a timestamp
+#  Logging: records are handed to a queue on the event-loop thread
+#  and formatted/written to stderr by a QueueListener thread.
+# ----------------------------------------------------------------
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted, so the message
+    interpolation (and repr() of its args) runs on the listener thread
+    rather than the event loop. The stock prepare() formats eagerly.
+    Safe here because logged args are never mutated after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.Queue(-1)
+logger.addHandler(_DeferredQueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+
+# ----------------------------------------------------------------
+#  In-memory cache for the “totals” JSON body and a timestamp
 #  This will be updated every 60 seconds by a background task
+#  while the market is open (every 15 minutes otherwise).
+#  Held as one (timestamp, body, etag) tuple: writers rebind the name
+#  to a new tuple, so readers always see a matching set.
+#  The body and its ETag are computed once per poll, not once per request.
 # ----------------------------------------------------------------
-cache = {
-    "timestamp": 0,
-    "totals": {"CE": {"totalOI": 0}, "PE": {"totalOI": 0}},
-}
+def _etag_for(body: bytes) -> str:
+    """
+    Strong ETag for a response body.
+    """
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    True if an If-None-Match header (`*` or a comma-separated list of
+    possibly weak `W/"..."` tags) matches `etag`, using weak comparison.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+_INITIAL_BODY = b'{"CE":{"totalOI":0},"PE":{"totalOI":0}}'
+_CACHE_REF: tuple[float, bytes, str] = (0.0, _INITIAL_BODY, _etag_for(_INITIAL_BODY))
 
 # ----------------------------------------------------------------
 #  Global variables for managing cookies
+#  A single aiohttp.ClientSession (app.state.session) is created at
+#  startup; its connector keeps warm connections to NSE and its
+#  CookieJar carries the Akamai cookies between requests.
 # ----------------------------------------------------------------
-session = requests.Session()
-session.headers.update({
+DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) "
                   "Chrome/116.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Connection": "keep-alive",
-})
+}
+
+# Per-request overrides for the JSON API. The session already sends
+# DEFAULT_HEADERS, and aiohttp merges these on top, so only the keys
+# that differ are listed.
+API_HEADERS = {
+    # JSON API expects slightly different Accept header
+    "Accept": "application/json, text/plain, */*",
+    "Referer": "https://www.nseindia.com/option-chain",
+}
+
+# JSON paths of the only two fields we need from the option-chain payload
+TOTAL_OI_PATHS = {"filtered.CE.totOI": "CE", "filtered.PE.totOI": "PE"}
 
 COOKIE_REFRESH_INTERVAL = 600  # seconds (10 minutes)
 API_POLL_INTERVAL = 60        # seconds (1 minute)
+STALE_THRESHOLD = 120         # seconds; older cache is served but refreshed
+MAX_BACKOFF = 300             # seconds; cap for retry delay after failed fetches
+
+# ----------------------------------------------------------------
+#  NSE market hours (IST). Outside them the totals don't change,
+#  so we poll far less often.
+# ----------------------------------------------------------------
+IST = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+OFF_HOURS_POLL_INTERVAL = 900   # seconds (15 minutes)
+OFF_HOURS_MAX_AGE = 3600        # seconds; cache this fresh is kept as-is off-hours
 _last_cookie_time = 0
-_cookies = {}  # will store the latest cookies as a dict
+_cookie_generation = 0  # bumped on every successful cookie refresh
+# NSE cookies are saved here so a restart can skip the bootstrap GETs
+COOKIE_FILE = Path(".nse_cookies.json")
+_last_etag: str | None = None  # ETag of the last 200 option-chain response
+_poll_failures = 0  # consecutive failed fetches; drives the retry backoff
+_next_fetch_allowed = 0.0  # time.time() before which no fetch is attempted
+
+# Returned by _fetch_option_chain_json when NSE answers 304 Not Modified
+NOT_MODIFIED = object()
 
 
-def _refresh_nse_cookies() -> None:
+async def _load_page(session: aiohttp.ClientSession, url: str) -> None:
+    """
+    GET a page only for the cookies it sets; raise on a non-2xx status.
+    """
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+
+
+async def _refresh_nse_cookies() -> None:
     """
     Load NSE homepage and option-chain landing page to set Akamai cookies.
-    Updates the module-level `_cookies` dict and `_last_cookie_time`.
+    Cookies are stored in the session's CookieJar; updates `_last_cookie_time`.
+    Single-flight: guarded by `app.state.cookie_lock`, and a caller that waited
+    while another refresh completed reuses that result instead of refetching.
     """
-    global _cookies, _last_cookie_time
+    # Compare refresh generations rather than wall-clock times, so a clock
+    # step or a bad saved timestamp can't make every refresh look done
+    generation = _cookie_generation
+    async with app.state.cookie_lock:
+        if _cookie_generation != generation:
+            # Someone else refreshed while we were waiting on the lock
+            return
+        await _do_refresh_nse_cookies()
 
-    try:
-        # 1) Hit the NSE homepage to obtain initial session cookies
-        resp_home = session.get("https://www.nseindia.com", timeout=10)
-        resp_home.raise_for_status()
 
-        # 2) Hit the option-chain landing page so NSE sets cookies specific to that page
-        resp_chain = session.get("https://www.nseindia.com/option-chain", timeout=10)
-        resp_chain.raise_for_status()
+async def _do_refresh_nse_cookies() -> None:
+    """
+    The actual cookie bootstrap; call via _refresh_nse_cookies().
+    """
+    global _last_cookie_time, _cookie_generation
+
+    session = app.state.session
+    try:
+        # 1) + 2) Hit the NSE homepage (initial session cookies) and the
+        # option-chain landing page (page-specific cookies) concurrently.
+        # Both write into the same cookie jar, so order doesn't matter.
+        await asyncio.gather(
+            _load_page(session, "https://www.nseindia.com"),
+            _load_page(session, "https://www.nseindia.com/option-chain"),
+        )
 
-        # 3) Now grab whatever cookies we have in the session
-        _cookies = session.cookies.get_dict()
+        # 3) The cookie jar now holds whatever cookies NSE handed out
         _last_cookie_time = time.time()
-        print("✅ Refreshed NSE cookies:", _cookies)
+        _cookie_generation += 1
+        cookies = {c.key: c.value for c in session.cookie_jar}
+        logger.info("✅ Refreshed NSE cookies: %s", cookies)
+        _save_nse_cookies(cookies)
 
     except Exception as e:
-        print(f"❌ Error refreshing NSE cookies: {e}")
+        logger.error("❌ Error refreshing NSE cookies: %s", e)
         # If fetching cookies fails, keep any old cookies (if present). 
         # Next cycle will try again.
 
 
-def _fetch_option_chain_json() -> dict | None:
+def _save_nse_cookies(cookies: dict) -> None:
+    """
+    Write the current cookies and `_last_cookie_time` to COOKIE_FILE.
+    """
+    try:
+        COOKIE_FILE.write_bytes(orjson.dumps({"cookies": cookies, "ts": _last_cookie_time}))
+    except Exception as e:
+        logger.error("❌ Error saving NSE cookies: %s", e)
+
+
+def _load_nse_cookies() -> None:
+    """
+    Seed the session's CookieJar from COOKIE_FILE if the saved cookies are
+    younger than COOKIE_REFRESH_INTERVAL; updates `_last_cookie_time`.
+    A missing or malformed file is ignored and cookies are bootstrapped
+    as usual on the first fetch.
+    """
+    global _last_cookie_time
+
+    try:
+        saved = orjson.loads(COOKIE_FILE.read_bytes())
+        ts = float(saved["ts"])
+        if not math.isfinite(ts) or ts > time.time():
+            raise ValueError(f"saved timestamp {saved['ts']!r} is not a past time")
+        cookies = saved["cookies"]
+        if not isinstance(cookies, dict):
+            raise TypeError(f"expected a dict of cookies, got {type(cookies).__name__}")
+
+        if time.time() - ts < COOKIE_REFRESH_INTERVAL:
+            app.state.session.cookie_jar.update_cookies(
+                cookies, URL("https://www.nseindia.com")
+            )
+            _last_cookie_time = ts
+            logger.info("✅ Loaded saved NSE cookies: %s", cookies)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        logger.error("❌ Error loading NSE cookies: %s", e)
+        app.state.session.cookie_jar.clear()
+
+
+async def _stream_total_oi(resp: aiohttp.ClientResponse) -> dict:
+    """
+    Stream-parse the response body with ijson and pick out only
+    `filtered.CE.totOI` / `filtered.PE.totOI`, stopping once both are seen.
+    The per-strike records are never materialized.
+    Returns a dict like {"CE": <int>, "PE": <int>}, or {} if either field
+    is missing (e.g. NSE answers `{}` when the cookies are bad).
+    """
+    found = {}
+    async for prefix, event, value in ijson.parse(resp.content, use_float=True):
+        side = TOTAL_OI_PATHS.get(prefix)
+        if side and event == "number":
+            found[side] = value
+            if len(found) == len(TOTAL_OI_PATHS):
+                return found
+    return {}
+
+
+async def _read_option_chain(resp: aiohttp.ClientResponse) -> dict | object:
     """
-    Fetches the raw JSON from the NSE option-chain API, using the current cookies.
+    Handle an option-chain API response:
+      • 304 Not Modified → bump the cache timestamp and return NOT_MODIFIED.
+      • 200 → stream out the CE/PE total OI and return it together with the
+        response's ETag under "etag" (or {} if the totals are missing).
+        The ETag is only remembered once _update_totals_from_json
+        publishes these totals.
+    """
+    global _CACHE_REF
+
+    if resp.status == 304:
+        _CACHE_REF = (time.time(), *_CACHE_REF[1:])
+        return NOT_MODIFIED
+
+    resp.raise_for_status()
+    totals = await _stream_total_oi(resp)
+    if not totals:
+        return {}
+    return {**totals, "etag": resp.headers.get("ETag")}
+
+
+async def _fetch_option_chain_json() -> dict | object | None:
+    """
+    Fetches the NSE option-chain API, using the current cookies.
     If cookies are older than COOKIE_REFRESH_INTERVAL, refresh them first.
+    Sends If-None-Match with the last ETag so an unchanged payload comes
+    back as an empty 304.
     If the request returns 401/403, attempt one immediate refresh + retry.
-    Returns the parsed JSON dict, or None on failure.
+    Returns the CE/PE total OI streamed out of the JSON, NOT_MODIFIED on a
+    304, or None on failure.
     """
-    global _cookies, _last_cookie_time
+    session = app.state.session
 
     now = time.time()
     # 1) Refresh cookies if > 10 minutes have passed or if no cookies exist yet
-    if now - _last_cookie_time > COOKIE_REFRESH_INTERVAL or not _cookies:
-        print("🕒 Cookies expired or missing; refreshing cookies.")
-        _refresh_nse_cookies()
+    if now - _last_cookie_time > COOKIE_REFRESH_INTERVAL or not len(session.cookie_jar):
+        logger.info("🕒 Cookies expired or missing; refreshing cookies.")
+        await _refresh_nse_cookies()
 
     api_url = "https://www.nseindia.com/api/option-chain-indices?symbol=NIFTY"
+    # Only revalidate if the cache actually holds data for that ETag
+    if _last_etag and _CACHE_REF[0]:
+        headers = {**API_HEADERS, "If-None-Match": _last_etag}
+    else:
+        headers = API_HEADERS
 
     try:
-        resp = session.get(
-            api_url,
-            headers={
-                # JSON API expects slightly different Accept header
-                "User-Agent": session.headers["User-Agent"],
-                "Accept-Language": session.headers["Accept-Language"],
-                "Accept": "application/json, text/plain, */*",
-                "Connection": session.headers["Connection"],
-                "Referer": "https://www.nseindia.com/option-chain",
-            },
-            cookies=_cookies,
-            timeout=10
-        )
-        # If unauthorized/forbidden, refresh cookies immediately and retry once
-        if resp.status_code in (401, 403):
-            print(f"⚠️ NSE API returned {resp.status_code}. Refreshing cookies and retrying.")
-            _refresh_nse_cookies()
-            resp = session.get(
-                api_url,
-                headers={
-                    "User-Agent": session.headers["User-Agent"],
-                    "Accept-Language": session.headers["Accept-Language"],
-                    "Accept": "application/json, text/plain, */*",
-                    "Connection": session.headers["Connection"],
-                    "Referer": "https://www.nseindia.com/option-chain",
-                },
-                cookies=_cookies,
-                timeout=10
-            )
+        async with session.get(api_url, headers=headers) as resp:
+            if resp.status not in (401, 403):
+                data = await _read_option_chain(resp)
+                return data
 
-        resp.raise_for_status()
-        data = resp.json()
-        return data
+        # If unauthorized/forbidden, refresh cookies immediately and retry once
+        logger.warning("⚠️ NSE API returned %s. Refreshing cookies and retrying.", resp.status)
+        await _refresh_nse_cookies()
+        async with session.get(api_url, headers=headers) as resp:
+            data = await _read_option_chain(resp)
+            return data
 
     except Exception as e:
-        print(f"❌ Error fetching option-chain JSON: {e}")
+        logger.error("❌ Error fetching option-chain JSON: %s", e)
         return None
 
 
 def _update_totals_from_json(data: dict) -> None:
     """
-    Extract CE/PE total OI from the raw JSON and update the in-memory cache.
+    Take the CE/PE total OI streamed out of the JSON and update the in-memory
+    cache. The payload's ETag is remembered only now, so If-None-Match always
+    refers to what the cache actually holds.
     """
-    ce_oi = data.get("filtered", {}).get("CE", {}).get("totOI", 0)
-    pe_oi = data.get("filtered", {}).get("PE", {}).get("totOI", 0)
+    global _CACHE_REF, _last_etag
+
+    ce_oi = data.get("CE", 0)
+    pe_oi = data.get("PE", 0)
 
     new_totals = {
         "CE": {"totalOI": ce_oi},
         "PE": {"totalOI": pe_oi},
     }
 
-    cache["timestamp"] = time.time()
-    cache["totals"] = new_totals
-    print("✅ Updated cache:", new_totals)
+    body = orjson.dumps(new_totals)
+    _CACHE_REF = (time.time(), body, _etag_for(body))
+    _last_etag = data.get("etag")
+    logger.info("✅ Updated cache: %s", new_totals)
+
+
+def _is_market_open() -> bool:
+    """
+    True on weekdays between MARKET_OPEN and MARKET_CLOSE (IST).
+    """
+    now_ist = datetime.now(IST)
+    return now_ist.weekday() < 5 and MARKET_OPEN <= now_ist.time() <= MARKET_CLOSE
+
+
+def _seconds_until_market_open() -> float:
+    """
+    Seconds from now until the next MARKET_OPEN on a weekday (IST).
+    """
+    now_ist = datetime.now(IST)
+    next_open = datetime.combine(now_ist.date(), MARKET_OPEN, tzinfo=IST)
+    if next_open <= now_ist:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return (next_open - now_ist).total_seconds()
+
+
+def _poll_interval() -> float:
+    """
+    Seconds to wait before the next poll, based on market hours.
+    Off-hours the wait is cut short so the first poll lands at MARKET_OPEN.
+    """
+    if _is_market_open():
+        return API_POLL_INTERVAL
+    return min(OFF_HOURS_POLL_INTERVAL, _seconds_until_market_open())
+
+
+def _stale_threshold() -> int:
+    """
+    Cache age (seconds) after which GET "/" triggers a refresh.
+    """
+    return STALE_THRESHOLD if _is_market_open() else OFF_HOURS_MAX_AGE
+
+
+def _record_fetch_result(ok: bool) -> float:
+    """
+    Update the shared failure/backoff state after a fetch and return the
+    delay until the next poll: the poll interval on success, otherwise
+    exponential backoff plus jitter (2, 4, 8, … up to MAX_BACKOFF seconds).
+    """
+    global _poll_failures, _next_fetch_allowed
+
+    if ok:
+        _poll_failures = 0
+        _next_fetch_allowed = 0.0
+        return _poll_interval()
+
+    _poll_failures += 1
+    delay = min(MAX_BACKOFF, 2 ** _poll_failures) + random.random() * 2
+    _next_fetch_allowed = time.time() + delay
+    logger.warning("⚠️ Received no data. Retrying in %.1f seconds.", delay)
+    return delay
 
 
-async def _background_fetch_loop() -> None:
+async def _refresh_once() -> None:
     """
-    Async background task that runs forever:
-      • Every API_POLL_INTERVAL seconds, fetch fresh JSON and update cache.
-      • If fetching fails, wait a short interval and retry.
+    One-shot fetch + cache update, kicked off by GET "/" when the cache is stale.
+    Guarded by `app.state.refresh_lock` so only one refresh is in flight, and
+    skipped while a failure backoff is pending.
     """
-    # Ensure cookies are loaded at least once before entering the loop
-    if not _cookies:
-        _refresh_nse_cookies()
+    async with app.state.refresh_lock:
+        # Another refresh (or a background poll) may have landed meanwhile
+        if time.time() - _CACHE_REF[0] <= _stale_threshold():
+            return
+        if time.time() < _next_fetch_allowed:
+            return
+        data = await _fetch_option_chain_json()
+        if data and data is not NOT_MODIFIED:
+            _update_totals_from_json(data)
+        # Either way, the next background poll follows from this result
+        _schedule_poll(_record_fetch_result(bool(data)))
 
-    while True:
+
+def _schedule_poll(delay: float) -> None:
+    """
+    Schedule the next _poll_once run `delay` seconds from now,
+    replacing any poll that is already scheduled.
+    """
+    if app.state.poll_handle is not None:
+        app.state.poll_handle.cancel()
+    app.state.poll_handle = asyncio.get_running_loop().call_later(delay, _start_poll)
+
+
+def _start_poll() -> None:
+    """
+    Launch one poll cycle as its own short-lived task.
+    """
+    app.state.poll_task = asyncio.create_task(_poll_once())
+
+
+async def _poll_once() -> None:
+    """
+    One background poll cycle, which schedules the next one when done:
+      • Every API_POLL_INTERVAL seconds during market hours (every
+        OFF_HOURS_POLL_INTERVAL otherwise), fetch fresh JSON and update cache.
+      • While the market is closed, skip the fetch if the cache is younger
+        than OFF_HOURS_MAX_AGE.
+      • If fetching fails, retry with backoff (see _record_fetch_result).
+    """
+    delay = _poll_interval()
+    try:
+        if (not _is_market_open()
+                and time.time() - _CACHE_REF[0] < OFF_HOURS_MAX_AGE):
+            # Market closed and cache is recent; nothing new to fetch
+            return
+
+        data = None
         try:
-            data = _fetch_option_chain_json()
-            if data:
+            data = await _fetch_option_chain_json()
+            if data is NOT_MODIFIED:
+                logger.info("✅ Option chain unchanged (304); cache timestamp bumped.")
+            elif data:
                 _update_totals_from_json(data)
-            else:
-                print("⚠️ Received no data. Will retry on next cycle.")
         except Exception as e:
-            print("❌ Unexpected exception in background loop:", e)
+            logger.error("❌ Unexpected exception in background poll: %s", e)
 
-        # Wait for the next cycle
-        await asyncio.sleep(API_POLL_INTERVAL)
+        delay = _record_fetch_result(bool(data))
+    except asyncio.CancelledError:
+        # Shutting down; don't re-arm the next poll
+        delay = None
+        raise
+    finally:
+        if delay is not None:
+            _schedule_poll(delay)
 
 
 @app.on_event("startup")
 async def startup_event():
     """
-    FastAPI startup event: launch the background fetch loop.
+    FastAPI startup event: start the log listener, create the shared
+    HTTP session (seeded with any saved cookies) and start the
+    self-rescheduling background poll.
     """
-    print("🚀 Starting background task to fetch NSE data every 60 seconds.")
-    asyncio.create_task(_background_fetch_loop())
+    _log_listener.start()
+    app.state.refresh_lock = asyncio.Lock()
+    app.state.cookie_lock = asyncio.Lock()
+    app.state.poll_handle = None
+    app.state.poll_task = None
+    app.state.refresh_task = None
+    app.state.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=10,
+            limit_per_host=5,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+        ),
+        headers=DEFAULT_HEADERS,
+        cookie_jar=aiohttp.CookieJar(),
+        timeout=aiohttp.ClientTimeout(total=10),
+    )
+    _load_nse_cookies()
+    logger.info("🚀 Starting background task to fetch NSE data "
+                "(every 60 seconds in market hours, 15 minutes otherwise).")
+    _start_poll()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    FastAPI shutdown event: stop polling, close the shared HTTP session
+    and flush logs.
+    """
+    if app.state.poll_handle is not None:
+        app.state.poll_handle.cancel()
+    if app.state.poll_task is not None:
+        app.state.poll_task.cancel()
+    if app.state.refresh_task is not None:
+        app.state.refresh_task.cancel()
+    await app.state.session.close()
+    _log_listener.stop()
 
 
 @app.get("/")
-async def get_option_totals():
+async def get_option_totals(request: Request):
     """
-    GET "/" endpoint:
-      • If cache is populated (timestamp > 0), return the CE/PE totals.
+    GET "/" endpoint (stale-while-revalidate):
+      • If cache is populated (timestamp > 0), return the CE/PE totals right away
+        with `X-Cache: HIT` (or `STALE`) and the cache age in `X-Cache-Age`.
+        `max-age` covers only the time left until the next poll, so shared
+        caches don't keep the body past it.
+      • If the cache is older than STALE_THRESHOLD (OFF_HOURS_MAX_AGE while
+        the market is closed), also start a one-shot
+        background refresh without waiting for it.
+      • If the client's If-None-Match matches the current ETag, return an
+        empty 304 instead of the body.
       • If cache is still empty (first few seconds after startup), return a 503.
     """
-    if cache["timestamp"] == 0:
+    ts, body, etag = _CACHE_REF
+    if ts == 0:
         # Service hasn’t fetched data yet
         return JSONResponse(
             status_code=503,
             content={"error": "Data not yet available; try again in a few seconds."}
         )
 
-    return JSONResponse(content=cache["totals"])
+    age = time.time() - ts
+    stale = age > _stale_threshold()
+    # Keep a reference to the in-flight refresh so it can't be garbage
+    # collected, and so a burst of requests spawns only one of them
+    refresh_task = app.state.refresh_task
+    if stale and (refresh_task is None or refresh_task.done()):
+        app.state.refresh_task = asyncio.create_task(_refresh_once())
+
+    max_age = max(0, int(_poll_interval() - age))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate=60",
+        "X-Cache": "STALE" if stale else "HIT",
+        # Not `Age`: shared caches would count it against max-age
+        "X-Cache-Age": str(int(age)),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)